@@ -10,15 +10,74 @@ Flighty stores flights in two tables:
 This script queries both tables to get the complete flight history.
 """
 
+import calendar
 import json
 import sqlite3
 import sys
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from itertools import chain
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON output when installed
+    orjson = None
+
 # Flighty database location (macOS)
 DEFAULT_DB_PATH = Path.home() / "Library/Containers/com.flightyapp.flighty/Data/Documents/MainFlightyDatabase.db"
 
+# Indexes backing the hot query filters and joins (name -> CREATE statement).
+# Departure filters use the COALESCE expression, so index that directly.
+INDEXES = {
+    "idx_uf_mine": "CREATE INDEX IF NOT EXISTS idx_uf_mine ON UserFlight(isMyFlight, userId, flightId) WHERE isMyFlight = 1",
+    "idx_flight_dep": "CREATE INDEX IF NOT EXISTS idx_flight_dep ON Flight(COALESCE(lastKnownDepartureDate, departureScheduleGateOriginal))",
+    "idx_ticket_flight_user": "CREATE INDEX IF NOT EXISTS idx_ticket_flight_user ON Ticket(flightId, userId)",
+    "idx_uf_import": "CREATE INDEX IF NOT EXISTS idx_uf_import ON UserFlight(importSource)",
+    "idx_uf_flight": "CREATE INDEX IF NOT EXISTS idx_uf_flight ON UserFlight(flightId)",
+    "idx_ticket_pnr": "CREATE INDEX IF NOT EXISTS idx_ticket_pnr ON Ticket(pnr COLLATE NOCASE)",
+}
+
+# Read-side tuning for the query connection: 64MB page cache, in-memory
+# temp tables for sorts, and memory-mapped reads. journal_mode/synchronous
+# only affect writers and are left to Flighty, which owns the database.
+PRAGMAS = """
+    PRAGMA cache_size = -65536;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA mmap_size = 268435456;
+"""
+
+
+# Output formats for local timestamps
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%S"
+DATE_FORMAT = "%Y-%m-%d"
+DISPLAY_FORMAT = "%b %d, %Y %I:%M %p"
+
+# Display names for Flighty's cabin class values
+CABIN_CLASSES = {
+    "economy": "Economy",
+    "premiumEconomy": "Premium Economy",
+    "business": "Business",
+    "first": "First",
+    "privateJet": "Private Jet",
+}
+
+# Fields of a list/next flight, selectable with --fields
+FLIGHT_FIELDS = frozenset({
+    "flight", "airline", "flight_number", "route", "departure", "arrival",
+    "confirmation", "seat", "cabin_class", "aircraft", "duration",
+    "distance_km", "distance_miles", "days_until", "import_source",
+    "tail_number", "source",
+})
+
+
+# Commands accepted by run_command, with or without a leading "--"
+COMMANDS = {
+    prefix + name
+    for name in ("list", "next", "date", "pnr", "stats", "recent")
+    for prefix in ("", "--")
+}
+
 
 def get_db_path():
     """Get database path, checking if it exists."""
@@ -28,414 +87,571 @@ def get_db_path():
     return db_path, None
 
 
-def convert_timestamp(ts):
-    """Convert Unix timestamp to ISO format (local time)."""
+def emit(result, indent=False):
+    """Write a result to stdout as JSON, using orjson when available."""
+    if orjson is not None:
+        data = orjson.dumps(result, option=orjson.OPT_INDENT_2 if indent else 0)
+    else:
+        data = json.dumps(result, indent=2 if indent else None).encode()
+    sys.stdout.buffer.write(data + b"\n")
+
+
+def ensure_indexes(conn, db_path):
+    """Create any missing query indexes and refresh planner statistics.
+
+    Only opens a writable connection when an index or the sqlite_stat1
+    statistics are missing, so after the first run this is a single read
+    of sqlite_master. The writer does not wait on locks: if Flighty is
+    writing, this run skips the work and the queries run unindexed.
+    """
+    existing = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'table')")}
+    missing = [sql for name, sql in INDEXES.items() if name not in existing]
+    needs_analyze = "sqlite_stat1" not in existing
+    if not missing and not needs_analyze:
+        return
+
+    writer = sqlite3.connect(db_path, timeout=0)
+    try:
+        for sql in missing:
+            writer.execute(sql)
+        writer.execute("ANALYZE")
+        writer.commit()
+    except sqlite3.Error:
+        writer.rollback()
+    finally:
+        writer.close()
+
+
+def open_database(db_path):
+    """Open a tuned, read-only connection to the Flighty database."""
+    conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True, cached_statements=256)
+    conn.executescript(PRAGMAS)
+    conn.row_factory = sqlite3.Row
+    ensure_indexes(conn, db_path)
+    return conn
+
+
+def local_time(ts):
+    """Convert Unix timestamp to a local time struct."""
     if ts is None:
         return None
-    return datetime.fromtimestamp(ts).isoformat()
+    return time.localtime(ts)
+
+
+def format_local(local, fmt):
+    """Format a local time struct, passing None through."""
+    if local is None:
+        return None
+    return time.strftime(fmt, local)
 
 
 def convert_date(ts):
     """Convert Unix timestamp to date string."""
-    if ts is None:
-        return None
-    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+    return format_local(local_time(ts), DATE_FORMAT)
 
 
 def format_datetime(ts):
     """Format timestamp for display."""
+    return format_local(local_time(ts), DISPLAY_FORMAT)
+
+
+# Route and flight labels repeat across rows (home airport, same carrier),
+# so each distinct label is stored once and shared by every row using it.
+# This saves string allocations, not time: a lookup costs about as much as
+# the f-string it replaces.
+_route_cache = {}
+_flight_cache = {}
+
+
+def route_label(dep_code, arr_code):
+    """Return the "DEP → ARR" label for a route."""
+    key = (dep_code, arr_code)
+    label = _route_cache.get(key)
+    if label is None:
+        label = _route_cache[key] = f"{dep_code} → {arr_code}"
+    return label
+
+
+def flight_code(airline_code, flight_number):
+    """Return the "AA 123" label for a flight."""
+    key = (airline_code, flight_number)
+    label = _flight_cache.get(key)
+    if label is None:
+        label = _flight_cache[key] = f"{airline_code} {flight_number}"
+    return label
+
+
+def flight_label(airline_code, flight_number, need_number=True):
+    """Return the "AA 123" label for a flight, or the bare number without an airline.
+
+    The upcoming-flight views also show the bare number when it is missing
+    (need_number); date and recent only check the airline, and so print
+    "AA None" for a numberless flight as they always have.
+    """
+    if not airline_code or (need_number and not flight_number):
+        return flight_number
+    return flight_code(airline_code, flight_number)
+
+
+def wall_clock(ts, local):
+    """Seconds since the epoch as read off the local wall clock.
+
+    Differences of these match differences of naive local datetimes,
+    so day counts ignore DST shifts the way the calendar does.
+    """
+    return calendar.timegm(local) + ts % 1
+
+
+def days_until(ts, local, now_wall):
+    """Calculate whole calendar days from now until a timestamp."""
     if ts is None:
         return None
-    return datetime.fromtimestamp(ts).strftime("%b %d, %Y %I:%M %p")
+    return int((wall_clock(ts, local) - now_wall) // 86400)
 
 
-def calculate_duration(departure, arrival):
-    """Calculate flight duration in hours and minutes."""
-    if departure is None or arrival is None:
+def format_duration(duration_seconds):
+    """Format a flight duration in seconds as hours and minutes."""
+    if duration_seconds is None:
         return None
-    duration_seconds = arrival - departure
     hours = int(duration_seconds // 3600)
     minutes = int((duration_seconds % 3600) // 60)
     return f"{hours}h {minutes}m"
 
 
-def days_until(ts):
-    """Calculate days until a timestamp."""
-    if ts is None:
-        return None
-    target = datetime.fromtimestamp(ts)
-    delta = target - datetime.now()
-    return delta.days
-
+TRACKED_UPCOMING_SELECT = """
+    SELECT
+        a.iata as airline_code,
+        a.name as airline_name,
+        f.number as flight_number,
+        dep.iata as dep_code,
+        dep.name as dep_airport,
+        dep.city as dep_city,
+        arr.iata as arr_code,
+        arr.name as arr_airport,
+        arr.city as arr_city,
+        COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) as departure,
+        COALESCE(f.lastKnownArrivalDate, f.arrivalScheduleGateOriginal) as arrival,
+        t.pnr as confirmation,
+        t.seatNumber as seat,
+        t.cabinClass as cabin_class,
+        f.equipmentModelName as aircraft,
+        f.departureTerminal as dep_terminal,
+        f.departureGate as dep_gate,
+        f.arrivalTerminal as arr_terminal,
+        f.arrivalGate as arr_gate,
+        f.distance as distance_km,
+        CAST(NULLIF(f.distance, 0) * 0.621371 AS INTEGER) as distance_miles,
+        COALESCE(f.lastKnownArrivalDate, f.arrivalScheduleGateOriginal)
+            - COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) as duration_s,
+        uf.importSource as import_source,
+        f.equipmentTailNumber as tail_number,
+        'tracked' as source
+    FROM Flight f
+    JOIN UserFlight uf ON f.id = uf.flightId
+    JOIN Airline a ON f.airlineId = a.id
+    JOIN Airport dep ON f.departureAirportId = dep.id
+    JOIN Airport arr ON f.actualArrivalAirportId = arr.id
+    LEFT JOIN Ticket t ON f.id = t.flightId AND uf.userId = t.userId
+"""
 
-def get_main_user_id(conn):
-    """Identify the main user (not a connected friend)."""
-    cursor = conn.cursor()
-    cursor.execute("""
+# The main user (not a connected friend) is resolved inline so the
+# lookup and the flight query run as a single statement.
+MAIN_USER_CTE = """
+    WITH main_user AS (
         SELECT userId
         FROM UserFlight
-        WHERE importSource != 'CONNECTED_FRIEND' AND importSource IS NOT NULL AND importSource != ''
+        WHERE importSource NOT IN ('', 'CONNECTED_FRIEND') AND importSource IS NOT NULL
         GROUP BY userId
         ORDER BY COUNT(*) DESC
         LIMIT 1
-    """)
-    row = cursor.fetchone()
-    return row[0] if row else None
-
-
-def query_tracked_upcoming(conn, now, main_user_id, include_friends, limit):
-    """Query tracked flights (Flight table) for upcoming flights."""
-    cursor = conn.cursor()
+    )
+"""
 
-    if include_friends:
-        where_clause = "uf.isMyFlight = 1 AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) > ?"
-        params = [now]
-    else:
-        where_clause = """
-            uf.isMyFlight = 1
-            AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) > ?
-            AND uf.userId = ?
-            AND uf.importSource != 'CONNECTED_FRIEND'
-        """
-        params = [now, main_user_id]
-
-    cursor.execute(f"""
-        SELECT
-            a.iata as airline_code,
-            a.name as airline_name,
-            f.number as flight_number,
-            dep.iata as dep_code,
-            dep.name as dep_airport,
-            dep.city as dep_city,
-            arr.iata as arr_code,
-            arr.name as arr_airport,
-            arr.city as arr_city,
-            COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) as departure,
-            COALESCE(f.lastKnownArrivalDate, f.arrivalScheduleGateOriginal) as arrival,
-            t.pnr as confirmation,
-            t.seatNumber as seat,
-            t.cabinClass as cabin_class,
-            f.equipmentModelName as aircraft,
-            f.departureTerminal as dep_terminal,
-            f.departureGate as dep_gate,
-            f.arrivalTerminal as arr_terminal,
-            f.arrivalGate as arr_gate,
-            f.distance as distance_km,
-            uf.importSource as import_source,
-            f.equipmentTailNumber as tail_number,
-            'tracked' as source
-        FROM Flight f
-        JOIN UserFlight uf ON f.id = uf.flightId
-        JOIN Airline a ON f.airlineId = a.id
-        JOIN Airport dep ON f.departureAirportId = dep.id
-        JOIN Airport arr ON f.actualArrivalAirportId = arr.id
-        LEFT JOIN Ticket t ON f.id = t.flightId AND uf.userId = t.userId
-        WHERE {where_clause}
-        ORDER BY departure
-        LIMIT ?
-    """, params + [limit * 2])  # Fetch extra to allow for merging
-
-    return cursor.fetchall()
+TRACKED_UPCOMING_MINE_WHERE = """
+    WHERE uf.isMyFlight = 1
+      AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) > :now
+      AND uf.userId = (SELECT userId FROM main_user)
+      AND uf.importSource != 'CONNECTED_FRIEND'
+"""
 
+SQL_LIST_MINE = MAIN_USER_CTE + TRACKED_UPCOMING_SELECT + TRACKED_UPCOMING_MINE_WHERE + """
+    ORDER BY departure
+    LIMIT :limit
+"""
 
-def query_manual_upcoming(conn, now, limit):
-    """Query manual flights (ManualFlight table) for upcoming flights."""
-    cursor = conn.cursor()
+SQL_LIST_INCLUDING_FRIENDS = TRACKED_UPCOMING_SELECT + """
+    WHERE uf.isMyFlight = 1
+      AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) > :now
+    ORDER BY departure
+    LIMIT :limit
+"""
 
-    cursor.execute("""
-        SELECT
-            NULL as airline_code,
-            NULL as airline_name,
-            mf.number as flight_number,
-            dep.iata as dep_code,
-            dep.name as dep_airport,
-            dep.city as dep_city,
-            arr.iata as arr_code,
-            arr.name as arr_airport,
-            arr.city as arr_city,
-            mf.lastKnownDepartureDate as departure,
-            mf.lastKnownArrivalDate as arrival,
-            NULL as confirmation,
-            NULL as seat,
-            NULL as cabin_class,
-            mf.equipmentModelName as aircraft,
-            mf.departureTerminal as dep_terminal,
-            mf.departureGate as dep_gate,
-            mf.arrivalTerminal as arr_terminal,
-            mf.arrivalGate as arr_gate,
-            mf.distance as distance_km,
-            'MANUAL' as import_source,
-            mf.equipmentTailNumber as tail_number,
-            'manual' as source
-        FROM ManualFlight mf
-        JOIN Airport dep ON mf.departureAirportId = dep.id
-        JOIN Airport arr ON mf.actualArrivalAirportId = arr.id
-        WHERE mf.lastKnownDepartureDate > ?
-        ORDER BY mf.lastKnownDepartureDate
-        LIMIT ?
-    """, (now, limit * 2))
-
-    return cursor.fetchall()
-
-
-def process_flight_row(row):
-    """Process a flight row into a dictionary."""
-    cabin_class = row[13]
-    if cabin_class:
-        cabin_display = cabin_class.replace("premiumEconomy", "Premium Economy").replace("privateJet", "Private Jet").title()
-    else:
-        cabin_display = None
 
-    departure_ts = row[9]
-    arrival_ts = row[10]
+def query_tracked_upcoming(conn, now, include_friends, limit):
+    """Query tracked flights (Flight table) for upcoming flights."""
+    sql = SQL_LIST_INCLUDING_FRIENDS if include_friends else SQL_LIST_MINE
+    return conn.execute(sql, {
+        "now": now,
+        "limit": limit * 2,  # Fetch extra to allow for merging
+    })
+
+
+MANUAL_UPCOMING_SELECT = """
+    SELECT
+        NULL as airline_code,
+        NULL as airline_name,
+        mf.number as flight_number,
+        dep.iata as dep_code,
+        dep.name as dep_airport,
+        dep.city as dep_city,
+        arr.iata as arr_code,
+        arr.name as arr_airport,
+        arr.city as arr_city,
+        mf.lastKnownDepartureDate as departure,
+        mf.lastKnownArrivalDate as arrival,
+        NULL as confirmation,
+        NULL as seat,
+        NULL as cabin_class,
+        mf.equipmentModelName as aircraft,
+        mf.departureTerminal as dep_terminal,
+        mf.departureGate as dep_gate,
+        mf.arrivalTerminal as arr_terminal,
+        mf.arrivalGate as arr_gate,
+        mf.distance as distance_km,
+        CAST(NULLIF(mf.distance, 0) * 0.621371 AS INTEGER) as distance_miles,
+        mf.lastKnownArrivalDate - mf.lastKnownDepartureDate as duration_s,
+        'MANUAL' as import_source,
+        mf.equipmentTailNumber as tail_number,
+        'manual' as source
+    FROM ManualFlight mf
+    JOIN Airport dep ON mf.departureAirportId = dep.id
+    JOIN Airport arr ON mf.actualArrivalAirportId = arr.id
+    WHERE mf.lastKnownDepartureDate > :now
+"""
 
-    return {
-        "flight": f"{row[0]} {row[2]}" if row[0] and row[2] else row[2],
-        "airline": row[1],
-        "flight_number": row[2],
-        "route": f"{row[3]} → {row[6]}",
-        "departure": {
-            "airport_code": row[3],
-            "airport_name": row[4],
-            "city": row[5],
-            "datetime": convert_timestamp(departure_ts),
-            "display": format_datetime(departure_ts),
-            "terminal": row[15],
-            "gate": row[16]
-        },
-        "arrival": {
-            "airport_code": row[6],
-            "airport_name": row[7],
-            "city": row[8],
-            "datetime": convert_timestamp(arrival_ts),
-            "display": format_datetime(arrival_ts),
-            "terminal": row[17],
-            "gate": row[18]
-        },
-        "confirmation": row[11],
-        "seat": row[12],
-        "cabin_class": cabin_display,
-        "aircraft": row[14],
-        "duration": calculate_duration(departure_ts, arrival_ts),
-        "distance_km": row[19],
-        "distance_miles": int(row[19] * 0.621371) if row[19] else None,
-        "days_until": days_until(departure_ts),
-        "import_source": row[20],
-        "tail_number": row[21],
-        "source": row[22],
-        "_departure_ts": departure_ts  # For sorting
-    }
+SQL_LIST_MANUAL = MANUAL_UPCOMING_SELECT + """
+    ORDER BY mf.lastKnownDepartureDate
+    LIMIT :limit
+"""
 
 
-def list_upcoming_flights(conn, limit=20, include_friends=False):
-    """List all upcoming flights with full details from both tables."""
-    now = datetime.now().timestamp()
-    main_user_id = get_main_user_id(conn)
+def query_manual_upcoming(conn, now, limit):
+    """Query manual flights (ManualFlight table) for upcoming flights."""
+    return conn.execute(SQL_LIST_MANUAL, {"now": now, "limit": limit * 2})
+
+
+def process_flight_row(row, departure_local, now_wall, fields=FLIGHT_FIELDS):
+    """Process a flight row into a dictionary with the requested fields.
+
+    departure_local is the row's departure as a local time struct, which
+    callers already need for dedup, so it is converted only once; now_wall
+    is the current wall_clock() value for days_until. Fields left out of
+    `fields` are neither computed nor serialized.
+    """
+    flight = {}
+
+    if "flight" in fields:
+        flight["flight"] = flight_label(row["airline_code"], row["flight_number"])
+    if "airline" in fields:
+        flight["airline"] = row["airline_name"]
+    if "flight_number" in fields:
+        flight["flight_number"] = row["flight_number"]
+    if "route" in fields:
+        flight["route"] = route_label(row["dep_code"], row["arr_code"])
+    if "departure" in fields:
+        flight["departure"] = {
+            "airport_code": row["dep_code"],
+            "airport_name": row["dep_airport"],
+            "city": row["dep_city"],
+            "datetime": format_local(departure_local, ISO_FORMAT),
+            "display": format_local(departure_local, DISPLAY_FORMAT),
+            "terminal": row["dep_terminal"],
+            "gate": row["dep_gate"]
+        }
+    if "arrival" in fields:
+        arrival_local = local_time(row["arrival"])
+        flight["arrival"] = {
+            "airport_code": row["arr_code"],
+            "airport_name": row["arr_airport"],
+            "city": row["arr_city"],
+            "datetime": format_local(arrival_local, ISO_FORMAT),
+            "display": format_local(arrival_local, DISPLAY_FORMAT),
+            "terminal": row["arr_terminal"],
+            "gate": row["arr_gate"]
+        }
+    if "confirmation" in fields:
+        flight["confirmation"] = row["confirmation"]
+    if "seat" in fields:
+        flight["seat"] = row["seat"]
+    if "cabin_class" in fields:
+        cabin_class = row["cabin_class"]
+        flight["cabin_class"] = CABIN_CLASSES.get(cabin_class) or (cabin_class.title() if cabin_class else None)
+    if "aircraft" in fields:
+        flight["aircraft"] = row["aircraft"]
+    if "duration" in fields:
+        flight["duration"] = format_duration(row["duration_s"])
+    if "distance_km" in fields:
+        flight["distance_km"] = row["distance_km"]
+    if "distance_miles" in fields:
+        flight["distance_miles"] = row["distance_miles"]
+    if "days_until" in fields:
+        flight["days_until"] = days_until(row["departure"], departure_local, now_wall)
+    if "import_source" in fields:
+        flight["import_source"] = row["import_source"]
+    if "tail_number" in fields:
+        flight["tail_number"] = row["tail_number"]
+    if "source" in fields:
+        flight["source"] = row["source"]
+
+    return flight
+
+
+def list_upcoming_flights(conn, limit=20, include_friends=False, fields=FLIGHT_FIELDS):
+    """List all upcoming flights with full details from both tables.
+
+    Dedup and sorting run on the raw rows, so flight dicts are only built
+    for the flights that are returned.
+    """
+    now = time.time()
 
     # Get flights from both tables
-    tracked_rows = query_tracked_upcoming(conn, now, main_user_id, include_friends, limit)
+    tracked_rows = query_tracked_upcoming(conn, now, include_friends, limit)
     manual_rows = query_manual_upcoming(conn, now, limit)
 
-    # Process and combine
-    flights = []
+    # Combine, keeping the first row seen for each flight
+    rows = []
     seen_keys = set()
 
-    for row in tracked_rows:
-        flight = process_flight_row(row)
+    for row in chain(tracked_rows, manual_rows):
         # Dedup key: date + route + flight number
-        dep_date = convert_date(flight["_departure_ts"])
-        key = f"{dep_date}|{flight['departure']['airport_code']}|{flight['arrival']['airport_code']}|{flight['flight_number']}"
-        if key not in seen_keys:
-            seen_keys.add(key)
-            flights.append(flight)
-
-    for row in manual_rows:
-        flight = process_flight_row(row)
-        dep_date = convert_date(flight["_departure_ts"])
-        key = f"{dep_date}|{flight['departure']['airport_code']}|{flight['arrival']['airport_code']}|{flight['flight_number']}"
+        departure_local = local_time(row["departure"])
+        dep_date = departure_local[:3] if departure_local else None
+        key = (dep_date, row["dep_code"], row["arr_code"], row["flight_number"])
         if key not in seen_keys:
             seen_keys.add(key)
-            flights.append(flight)
+            rows.append((row, departure_local))
 
     # Sort by departure time and limit
-    flights.sort(key=lambda f: f["_departure_ts"] or 0)
-    flights = flights[:limit]
-
-    # Remove internal sort key
-    for f in flights:
-        del f["_departure_ts"]
+    rows.sort(key=lambda entry: entry[0]["departure"] or 0)
 
+    now_wall = wall_clock(now, time.localtime(now))
+    flights = [process_flight_row(row, departure_local, now_wall, fields) for row, departure_local in rows[:limit]]
     return {"flights": flights, "count": len(flights)}
 
 
-def get_next_flight(conn):
+# Earliest upcoming flight across both tables; tracked wins a departure tie
+SQL_NEXT = MAIN_USER_CTE + TRACKED_UPCOMING_SELECT + TRACKED_UPCOMING_MINE_WHERE + """
+    UNION ALL
+""" + MANUAL_UPCOMING_SELECT + """
+    ORDER BY departure, source DESC
+    LIMIT 1
+"""
+
+
+def get_next_flight(conn, fields=FLIGHT_FIELDS):
     """Get the next upcoming flight."""
-    result = list_upcoming_flights(conn, limit=1)
-    if result["flights"]:
-        return {"next_flight": result["flights"][0]}
+    now = time.time()
+    row = conn.execute(SQL_NEXT, {"now": now}).fetchone()
+    if row:
+        return {"next_flight": process_flight_row(row, local_time(row["departure"]), wall_clock(now, time.localtime(now)), fields)}
     return {"next_flight": None, "message": "No upcoming flights found"}
 
 
+SQL_DATE_TRACKED = """
+    SELECT
+        a.iata as airline_code,
+        f.number as flight_number,
+        dep.iata as dep_code,
+        arr.iata as arr_code,
+        COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) as departure,
+        COALESCE(f.lastKnownArrivalDate, f.arrivalScheduleGateOriginal) as arrival,
+        t.pnr as confirmation,
+        t.seatNumber as seat,
+        t.cabinClass as cabin_class,
+        f.equipmentModelName as aircraft,
+        f.equipmentTailNumber as tail_number
+    FROM Flight f
+    JOIN UserFlight uf ON f.id = uf.flightId
+    JOIN Airline a ON f.airlineId = a.id
+    JOIN Airport dep ON f.departureAirportId = dep.id
+    JOIN Airport arr ON f.actualArrivalAirportId = arr.id
+    LEFT JOIN Ticket t ON f.id = t.flightId AND uf.userId = t.userId
+    WHERE uf.isMyFlight = 1
+      AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) >= :start
+      AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) < :end
+    ORDER BY departure
+"""
+
+SQL_DATE_MANUAL = """
+    SELECT
+        mf.number as flight_number,
+        dep.iata as dep_code,
+        arr.iata as arr_code,
+        mf.lastKnownDepartureDate as departure,
+        mf.lastKnownArrivalDate as arrival,
+        mf.equipmentModelName as aircraft,
+        mf.equipmentTailNumber as tail_number
+    FROM ManualFlight mf
+    JOIN Airport dep ON mf.departureAirportId = dep.id
+    JOIN Airport arr ON mf.actualArrivalAirportId = arr.id
+    WHERE mf.lastKnownDepartureDate >= :start
+      AND mf.lastKnownDepartureDate < :end
+    ORDER BY mf.lastKnownDepartureDate
+"""
+
+
 def get_flights_on_date(conn, date_str):
     """Get flights on a specific date (YYYY-MM-DD format)."""
     cursor = conn.cursor()
 
     try:
         target_date = datetime.strptime(date_str, "%Y-%m-%d")
-        start_ts = target_date.timestamp()
-        end_ts = (target_date.replace(hour=23, minute=59, second=59)).timestamp()
+        start_ts = int(target_date.timestamp())
+        # Next local midnight, exclusive (not start + 86400, which is off on DST days)
+        end_ts = int((target_date + timedelta(days=1)).timestamp())
     except ValueError:
         return {"error": f"Invalid date format: {date_str}. Use YYYY-MM-DD"}
 
     flights = []
 
     # Query tracked flights
-    cursor.execute("""
-        SELECT
-            a.iata as airline_code,
-            f.number as flight_number,
-            dep.iata as dep_code,
-            arr.iata as arr_code,
-            COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) as departure,
-            COALESCE(f.lastKnownArrivalDate, f.arrivalScheduleGateOriginal) as arrival,
-            t.pnr as confirmation,
-            t.seatNumber as seat,
-            t.cabinClass as cabin_class,
-            f.equipmentModelName as aircraft,
-            f.equipmentTailNumber as tail_number
-        FROM Flight f
-        JOIN UserFlight uf ON f.id = uf.flightId
-        JOIN Airline a ON f.airlineId = a.id
-        JOIN Airport dep ON f.departureAirportId = dep.id
-        JOIN Airport arr ON f.actualArrivalAirportId = arr.id
-        LEFT JOIN Ticket t ON f.id = t.flightId AND uf.userId = t.userId
-        WHERE uf.isMyFlight = 1
-          AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) >= ?
-          AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) <= ?
-        ORDER BY departure
-    """, (start_ts, end_ts))
-
-    for row in cursor.fetchall():
+    cursor.execute(SQL_DATE_TRACKED, {"start": start_ts, "end": end_ts})
+
+    for row in cursor:
         flights.append({
-            "flight": f"{row[0]} {row[1]}" if row[0] else row[1],
-            "route": f"{row[2]} → {row[3]}",
-            "departure": format_datetime(row[4]),
-            "arrival": format_datetime(row[5]),
-            "confirmation": row[6],
-            "seat": row[7],
-            "cabin_class": row[8],
-            "aircraft": row[9],
-            "tail_number": row[10],
+            "flight": flight_label(row["airline_code"], row["flight_number"], need_number=False),
+            "route": route_label(row["dep_code"], row["arr_code"]),
+            "departure": format_datetime(row["departure"]),
+            "arrival": format_datetime(row["arrival"]),
+            "confirmation": row["confirmation"],
+            "seat": row["seat"],
+            "cabin_class": row["cabin_class"],
+            "aircraft": row["aircraft"],
+            "tail_number": row["tail_number"],
             "source": "tracked"
         })
 
     # Query manual flights
-    cursor.execute("""
-        SELECT
-            mf.number as flight_number,
-            dep.iata as dep_code,
-            arr.iata as arr_code,
-            mf.lastKnownDepartureDate as departure,
-            mf.lastKnownArrivalDate as arrival,
-            mf.equipmentModelName as aircraft,
-            mf.equipmentTailNumber as tail_number
-        FROM ManualFlight mf
-        JOIN Airport dep ON mf.departureAirportId = dep.id
-        JOIN Airport arr ON mf.actualArrivalAirportId = arr.id
-        WHERE mf.lastKnownDepartureDate >= ?
-          AND mf.lastKnownDepartureDate <= ?
-        ORDER BY mf.lastKnownDepartureDate
-    """, (start_ts, end_ts))
-
-    for row in cursor.fetchall():
+    cursor.execute(SQL_DATE_MANUAL, {"start": start_ts, "end": end_ts})
+
+    for row in cursor:
         flights.append({
-            "flight": row[0],
-            "route": f"{row[1]} → {row[2]}",
-            "departure": format_datetime(row[3]),
-            "arrival": format_datetime(row[4]),
+            "flight": row["flight_number"],
+            "route": route_label(row["dep_code"], row["arr_code"]),
+            "departure": format_datetime(row["departure"]),
+            "arrival": format_datetime(row["arrival"]),
             "confirmation": None,
             "seat": None,
             "cabin_class": None,
-            "aircraft": row[5],
-            "tail_number": row[6],
+            "aircraft": row["aircraft"],
+            "tail_number": row["tail_number"],
             "source": "manual"
         })
 
     return {"date": date_str, "flights": flights, "count": len(flights)}
 
 
-def search_by_confirmation(conn, pnr):
-    """Search flights by confirmation/PNR code."""
+PNR_SELECT = """
+    SELECT
+        a.iata as airline_code,
+        f.number as flight_number,
+        dep.iata as dep_code,
+        arr.iata as arr_code,
+        COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) as departure,
+        COALESCE(f.lastKnownArrivalDate, f.arrivalScheduleGateOriginal) as arrival,
+        t.pnr as confirmation,
+        t.seatNumber as seat,
+        t.cabinClass as cabin_class,
+        f.equipmentModelName as aircraft
+    FROM Flight f
+    JOIN UserFlight uf ON f.id = uf.flightId
+    JOIN Airline a ON f.airlineId = a.id
+    JOIN Airport dep ON f.departureAirportId = dep.id
+    JOIN Airport arr ON f.actualArrivalAirportId = arr.id
+    JOIN Ticket t ON f.id = t.flightId AND uf.userId = t.userId
+"""
+
+SQL_PNR_EXACT = PNR_SELECT + """
+    WHERE t.pnr = :pnr COLLATE NOCASE
+    ORDER BY departure
+"""
+
+SQL_PNR_CONTAINS = PNR_SELECT + """
+    WHERE t.pnr LIKE :pnr
+    ORDER BY departure
+"""
+
+
+def search_by_confirmation(conn, pnr, contains=False):
+    """Search flights by confirmation/PNR code (exact match unless contains=True)."""
     cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT
-            a.iata as airline_code,
-            f.number as flight_number,
-            dep.iata as dep_code,
-            arr.iata as arr_code,
-            COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) as departure,
-            COALESCE(f.lastKnownArrivalDate, f.arrivalScheduleGateOriginal) as arrival,
-            t.pnr as confirmation,
-            t.seatNumber as seat,
-            t.cabinClass as cabin_class,
-            f.equipmentModelName as aircraft
-        FROM Flight f
-        JOIN UserFlight uf ON f.id = uf.flightId
-        JOIN Airline a ON f.airlineId = a.id
-        JOIN Airport dep ON f.departureAirportId = dep.id
-        JOIN Airport arr ON f.actualArrivalAirportId = arr.id
-        JOIN Ticket t ON f.id = t.flightId AND uf.userId = t.userId
-        WHERE t.pnr LIKE ?
-        ORDER BY departure
-    """, (f"%{pnr}%",))
+    if contains:
+        cursor.execute(SQL_PNR_CONTAINS, {"pnr": f"%{pnr}%"})
+    else:
+        cursor.execute(SQL_PNR_EXACT, {"pnr": pnr})
 
     flights = []
-    for row in cursor.fetchall():
+    for row in cursor:
         flights.append({
-            "flight": f"{row[0]} {row[1]}",
-            "route": f"{row[2]} → {row[3]}",
-            "departure": format_datetime(row[4]),
-            "arrival": format_datetime(row[5]),
-            "confirmation": row[6],
-            "seat": row[7],
-            "cabin_class": row[8],
-            "aircraft": row[9]
+            "flight": flight_code(row["airline_code"], row["flight_number"]),
+            "route": route_label(row["dep_code"], row["arr_code"]),
+            "departure": format_datetime(row["departure"]),
+            "arrival": format_datetime(row["arrival"]),
+            "confirmation": row["confirmation"],
+            "seat": row["seat"],
+            "cabin_class": row["cabin_class"],
+            "aircraft": row["aircraft"]
         })
 
     return {"confirmation": pnr, "flights": flights, "count": len(flights)}
 
 
+# Totals walk the partial idx_uf_mine index; upcoming is a separate
+# range probe on idx_flight_dep (joined via idx_uf_flight) instead of a
+# CASE over every flight.
+SQL_STATS_TRACKED = """
+    SELECT
+        COUNT(*) as total_flights,
+        SUM(f.distance) as total_km
+    FROM UserFlight uf
+    JOIN Flight f ON f.id = uf.flightId
+    WHERE uf.isMyFlight = 1
+"""
+
+SQL_STATS_TRACKED_UPCOMING = """
+    SELECT COUNT(*) as upcoming
+    FROM Flight f
+    JOIN UserFlight uf ON f.id = uf.flightId
+    WHERE uf.isMyFlight = 1
+      AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) > :now
+"""
+
+SQL_STATS_MANUAL = """
+    SELECT
+        COUNT(*) as total_flights,
+        SUM(CASE WHEN lastKnownDepartureDate > :now THEN 1 ELSE 0 END) as upcoming,
+        SUM(distance) as total_km
+    FROM ManualFlight
+"""
+
+
 def get_flight_stats(conn):
     """Get flight statistics from both tables."""
     cursor = conn.cursor()
-    now = datetime.now().timestamp()
+    now = time.time()
 
     # Stats from tracked flights
-    cursor.execute("""
-        SELECT
-            COUNT(*) as total_flights,
-            SUM(CASE WHEN COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) > ? THEN 1 ELSE 0 END) as upcoming,
-            SUM(f.distance) as total_km
-        FROM Flight f
-        JOIN UserFlight uf ON f.id = uf.flightId
-        WHERE uf.isMyFlight = 1
-    """, (now,))
-    tracked = cursor.fetchone()
+    tracked = cursor.execute(SQL_STATS_TRACKED).fetchone()
+    tracked_upcoming = cursor.execute(SQL_STATS_TRACKED_UPCOMING, {"now": now}).fetchone()
 
     # Stats from manual flights
-    cursor.execute("""
-        SELECT
-            COUNT(*) as total_flights,
-            SUM(CASE WHEN lastKnownDepartureDate > ? THEN 1 ELSE 0 END) as upcoming,
-            SUM(distance) as total_km
-        FROM ManualFlight
-    """, (now,))
+    cursor.execute(SQL_STATS_MANUAL, {"now": now})
     manual = cursor.fetchone()
 
-    total_flights = (tracked[0] or 0) + (manual[0] or 0)
-    upcoming_flights = (tracked[1] or 0) + (manual[1] or 0)
-    total_km = (tracked[2] or 0) + (manual[2] or 0)
+    total_flights = (tracked["total_flights"] or 0) + (manual["total_flights"] or 0)
+    upcoming_flights = tracked_upcoming["upcoming"] + (manual["upcoming"] or 0)
+    total_km = (tracked["total_km"] or 0) + (manual["total_km"] or 0)
 
     return {
         "total_flights": total_flights,
@@ -443,148 +659,196 @@ def get_flight_stats(conn):
         "total_distance_km": total_km,
         "total_distance_miles": int(total_km * 0.621371),
         "earth_circumferences": round(total_km / 40075, 2),
-        "tracked_flights": tracked[0] or 0,
-        "manual_flights": manual[0] or 0
+        "tracked_flights": tracked["total_flights"] or 0,
+        "manual_flights": manual["total_flights"] or 0
     }
 
 
-def get_recent_flights(conn, limit=20):
-    """Get recent/past flights from both tables."""
-    cursor = conn.cursor()
-    now = datetime.now().timestamp()
+SQL_RECENT_TRACKED = """
+    SELECT
+        a.iata as airline_code,
+        f.number as flight_number,
+        dep.iata as dep_code,
+        arr.iata as arr_code,
+        COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) as departure,
+        f.equipmentModelName as aircraft,
+        f.distance as distance_km,
+        f.equipmentTailNumber as tail_number,
+        'tracked' as source
+    FROM Flight f
+    JOIN UserFlight uf ON f.id = uf.flightId
+    JOIN Airline a ON f.airlineId = a.id
+    JOIN Airport dep ON f.departureAirportId = dep.id
+    JOIN Airport arr ON f.actualArrivalAirportId = arr.id
+    WHERE uf.isMyFlight = 1
+      AND uf.isArchived = 0
+      AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) < :now
+    ORDER BY departure DESC
+    LIMIT :limit
+"""
 
-    flights = []
+SQL_RECENT_MANUAL = """
+    SELECT
+        NULL as airline_code,
+        mf.number as flight_number,
+        dep.iata as dep_code,
+        arr.iata as arr_code,
+        mf.lastKnownDepartureDate as departure,
+        mf.equipmentModelName as aircraft,
+        mf.distance as distance_km,
+        mf.equipmentTailNumber as tail_number,
+        'manual' as source
+    FROM ManualFlight mf
+    JOIN Airport dep ON mf.departureAirportId = dep.id
+    JOIN Airport arr ON mf.actualArrivalAirportId = arr.id
+    WHERE mf.lastKnownDepartureDate < :now
+    ORDER BY mf.lastKnownDepartureDate DESC
+    LIMIT :limit
+"""
 
-    # Query tracked flights
-    cursor.execute("""
-        SELECT
-            a.iata as airline_code,
-            f.number as flight_number,
-            dep.iata as dep_code,
-            arr.iata as arr_code,
-            COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) as departure,
-            f.equipmentModelName as aircraft,
-            f.distance as distance_km,
-            f.equipmentTailNumber as tail_number,
-            'tracked' as source
-        FROM Flight f
-        JOIN UserFlight uf ON f.id = uf.flightId
-        JOIN Airline a ON f.airlineId = a.id
-        JOIN Airport dep ON f.departureAirportId = dep.id
-        JOIN Airport arr ON f.actualArrivalAirportId = arr.id
-        WHERE uf.isMyFlight = 1
-          AND uf.isArchived = 0
-          AND COALESCE(f.lastKnownDepartureDate, f.departureScheduleGateOriginal) < ?
-        ORDER BY departure DESC
-        LIMIT ?
-    """, (now, limit * 2))
-
-    for row in cursor.fetchall():
-        flights.append({
-            "flight": f"{row[0]} {row[1]}" if row[0] else row[1],
-            "route": f"{row[2]} → {row[3]}",
-            "date": convert_date(row[4]),
-            "aircraft": row[5],
-            "distance_km": row[6],
-            "tail_number": row[7],
-            "source": row[8],
-            "_ts": row[4]
-        })
 
-    # Query manual flights
-    cursor.execute("""
-        SELECT
-            mf.number as flight_number,
-            dep.iata as dep_code,
-            arr.iata as arr_code,
-            mf.lastKnownDepartureDate as departure,
-            mf.equipmentModelName as aircraft,
-            mf.distance as distance_km,
-            mf.equipmentTailNumber as tail_number,
-            'manual' as source
-        FROM ManualFlight mf
-        JOIN Airport dep ON mf.departureAirportId = dep.id
-        JOIN Airport arr ON mf.actualArrivalAirportId = arr.id
-        WHERE mf.lastKnownDepartureDate < ?
-        ORDER BY mf.lastKnownDepartureDate DESC
-        LIMIT ?
-    """, (now, limit * 2))
-
-    for row in cursor.fetchall():
-        flights.append({
-            "flight": row[0],
-            "route": f"{row[1]} → {row[2]}",
-            "date": convert_date(row[3]),
-            "aircraft": row[4],
-            "distance_km": row[5],
-            "tail_number": row[6],
-            "source": row[7],
-            "_ts": row[3]
-        })
+def process_recent_row(row):
+    """Process a recent flight row into a dictionary."""
+    return {
+        "flight": flight_label(row["airline_code"], row["flight_number"], need_number=False),
+        "route": route_label(row["dep_code"], row["arr_code"]),
+        "date": convert_date(row["departure"]),
+        "aircraft": row["aircraft"],
+        "distance_km": row["distance_km"],
+        "tail_number": row["tail_number"],
+        "source": row["source"]
+    }
 
-    # Sort by date descending and limit
-    flights.sort(key=lambda f: f["_ts"] or 0, reverse=True)
-    flights = flights[:limit]
 
-    # Remove internal sort key
-    for f in flights:
-        del f["_ts"]
+def get_recent_flights(conn, limit=20):
+    """Get recent/past flights from both tables."""
+    now = time.time()
+
+    # Query tracked and manual flights
+    params = {"now": now, "limit": limit * 2}
+    rows = conn.execute(SQL_RECENT_TRACKED, params).fetchall()
+    rows += conn.execute(SQL_RECENT_MANUAL, params).fetchall()
+
+    # Sort by date descending and limit
+    rows.sort(key=lambda row: row["departure"] or 0, reverse=True)
 
+    flights = [process_recent_row(row) for row in rows[:limit]]
     return {"recent_flights": flights, "count": len(flights)}
 
 
+def parse_list_args(args):
+    """Parse list arguments into (limit, include_friends)."""
+    limit = 20
+    include_friends = False
+    for arg in args:
+        if arg == "--include-friends":
+            include_friends = True
+        elif arg.isdigit():
+            limit = int(arg)
+    return limit, include_friends
+
+
+def parse_fields(args):
+    """Parse --fields a,b,c into (fields, error), defaulting to all fields."""
+    if "--fields" not in args:
+        return FLIGHT_FIELDS, None
+    index = args.index("--fields")
+    value = args[index + 1] if index + 1 < len(args) else ""
+    fields = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = fields - FLIGHT_FIELDS
+    if not fields or unknown:
+        return None, f"Invalid --fields: {value or '(empty)'}. Choose from: {', '.join(sorted(FLIGHT_FIELDS))}"
+    return fields, None
+
+
+def parse_recent_args(args):
+    """Parse recent arguments into a limit."""
+    return int(args[0]) if args else 20
+
+
+def run_command(conn, command, args):
+    """Run a single query command against an open connection."""
+    if command == "list" or command == "--list" or command == "next" or command == "--next":
+        fields, error = parse_fields(args)
+        if error:
+            return {"error": error}
+        if command == "next" or command == "--next":
+            return get_next_flight(conn, fields)
+        return list_upcoming_flights(conn, *parse_list_args(args), fields)
+    elif command in COMMANDS and "--fields" in args:
+        return {"error": f"--fields is only supported by list and next, not {command.lstrip('-')}"}
+    elif command == "date" or command == "--date":
+        if not args:
+            return {"error": "Usage: query_flights.py date YYYY-MM-DD"}
+        return get_flights_on_date(conn, args[0])
+    elif command == "pnr" or command == "--pnr":
+        if not args:
+            return {"error": "Usage: query_flights.py pnr <confirmation_code> [--contains]"}
+        return search_by_confirmation(conn, args[0], "--contains" in args[1:])
+    elif command == "stats" or command == "--stats":
+        return get_flight_stats(conn)
+    elif command == "recent" or command == "--recent":
+        return get_recent_flights(conn, parse_recent_args(args))
+    return {"error": f"Unknown command: {command}. Use: list, next, date, pnr, stats, recent, batch"}
+
+
+def run_batch(conn, spec):
+    """Run a JSON array of commands on one connection, keyed by entry text.
+
+    Each entry is either a command string ("recent 5") or an argument
+    list (["pnr", "ABC123"]); results are keyed by the entry's arguments
+    joined with spaces, so "list 2" and "list 1" stay separate.
+    """
+    try:
+        commands = json.loads(spec)
+    except ValueError:
+        commands = None
+    if not isinstance(commands, list):
+        return {"error": 'Usage: query_flights.py batch \'["list 5", "stats", ["pnr", "ABC123"]]\''}
+
+    results = {}
+    for entry in commands:
+        parts = entry.split() if isinstance(entry, str) else entry
+        if not isinstance(parts, list) or not parts:
+            return {"error": f"Invalid batch entry: {json.dumps(entry)}"}
+        name, *args = parts = [str(part) for part in parts]
+        # A failing entry reports its own error without losing the others
+        try:
+            results[" ".join(parts)] = run_command(conn, name, args)
+        except Exception as e:
+            results[" ".join(parts)] = {"error": str(e)}
+    return results
+
+
 def main():
     """Main entry point."""
     if len(sys.argv) < 2:
-        print(json.dumps({"error": "Usage: query_flights.py <command> [args]"}))
+        emit({"error": "Usage: query_flights.py <command> [args]"})
         sys.exit(1)
 
-    command = sys.argv[1] if not sys.argv[1].startswith("--") else "list"
+    command = sys.argv[1] if not sys.argv[1].startswith("--") or sys.argv[1] == "--batch" else "list"
 
     # Check database
     db_path, error = get_db_path()
     if error:
-        print(json.dumps({"error": error}))
+        emit({"error": error})
         sys.exit(1)
 
-    # Execute command
+    # Execute command (batch runs every command against the same connection)
     try:
-        conn = sqlite3.connect(db_path)
-
-        if command == "list" or command == "--list":
-            limit = 20
-            include_friends = False
-            for arg in sys.argv[2:]:
-                if arg == "--include-friends":
-                    include_friends = True
-                elif arg.isdigit():
-                    limit = int(arg)
-            result = list_upcoming_flights(conn, limit, include_friends)
-        elif command == "next" or command == "--next":
-            result = get_next_flight(conn)
-        elif command == "date" or command == "--date":
-            if len(sys.argv) < 3:
-                result = {"error": "Usage: query_flights.py date YYYY-MM-DD"}
-            else:
-                result = get_flights_on_date(conn, sys.argv[2])
-        elif command == "pnr" or command == "--pnr":
-            if len(sys.argv) < 3:
-                result = {"error": "Usage: query_flights.py pnr <confirmation_code>"}
-            else:
-                result = search_by_confirmation(conn, sys.argv[2])
-        elif command == "stats" or command == "--stats":
-            result = get_flight_stats(conn)
-        elif command == "recent" or command == "--recent":
-            limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
-            result = get_recent_flights(conn, limit)
+        conn = open_database(db_path)
+
+        if command == "batch" or command == "--batch":
+            result = run_batch(conn, sys.argv[2] if len(sys.argv) > 2 else "")
         else:
-            result = {"error": f"Unknown command: {command}. Use: list, next, date, pnr, stats, recent"}
+            result = run_command(conn, command, sys.argv[2:])
+
+        emit(result, indent=True)
 
         conn.close()
-        print(json.dumps(result, indent=2))
 
     except Exception as e:
-        print(json.dumps({"error": str(e)}))
+        emit({"error": str(e)})
         sys.exit(1)
 
 